@@ -1,25 +1,80 @@
 import asyncio
+import hashlib
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 import os
-from typing import Optional
+from pathlib import Path
+import queue
+from typing import Any, Callable, Dict, Optional
 
 import discord
 from discord.ext import commands
 from dotenv import load_dotenv
 from pydantic import ValidationError
-from utils.config import Config
+from utils.cache import UserCache
+from utils.config import Config, FrozenConfig, freeze_config
+from utils.extensions import discover_cogs, warm_cogs
+
+try:
+    import uvloop
+except ImportError:
+    # uvloop is optional (and unavailable on Windows); fall back to the stock loop.
+    uvloop = None  # type: ignore[assignment]
 
 # Load environment variables
 load_dotenv()
 
 # Configure logging
+class BufferedRotatingFileHandler(RotatingFileHandler):
+    """Rotating file handler that writes through a large buffer.
+
+    Records reach the disk when the buffer fills, on rollover/close, or right away
+    for warnings and above so problems stay visible without waiting for the buffer.
+    The file size is tracked here instead of asking the stream, because the base
+    class's seek()/tell() per record would flush the buffer every time.
+    """
+
+    buffer_size = 1 << 16
+
+    def _open(self):
+        stream = open(
+            self.baseFilename,
+            self.mode,
+            buffering=self.buffer_size,
+            encoding=self.encoding,
+            errors=self.errors,
+        )
+        try:
+            self._size = os.path.getsize(self.baseFilename)
+        except OSError:
+            self._size = 0
+        return stream
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.stream is None:
+            self.stream = self._open()
+        encoded = (self.format(record) + self.terminator).encode(self.encoding or 'utf-8', 'replace')
+        self._pending = len(encoded)
+        return 0 < self.maxBytes <= self._size + self._pending
+
+    def flush(self):
+        # StreamHandler flushes after every record; leave that to the buffer instead.
+        pass
+
+    def emit(self, record: logging.LogRecord):
+        self._pending = 0
+        super().emit(record)
+        self._size += self._pending
+        if record.levelno >= logging.WARNING and self.stream:
+            super().flush()
+
 handlers: list[logging.Handler] = [logging.StreamHandler()]
 
 # File logging is best-effort: some hosts have very limited disk.
 try:
     handlers.append(
-        RotatingFileHandler(
+        BufferedRotatingFileHandler(
             'modmail_bot.log',
             maxBytes=1_000_000,
             backupCount=2,
@@ -31,75 +86,149 @@ except OSError:
     # Disk full / read-only FS / permission issue — continue with console logging.
     pass
 
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+for handler in handlers:
+    handler.setFormatter(formatter)
+
+# The real handlers run on the listener's thread, so log I/O never blocks the event loop;
+# the root logger only enqueues records. The listener is started/stopped by main().
+log_queue: queue.SimpleQueue = queue.SimpleQueue()
+log_listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+
+# QueueHandler.prepare() bakes its formatted output into record.msg; keep that to the bare
+# message so the listener's handlers don't wrap an already formatted line.
+queue_handler = QueueHandler(log_queue)
+queue_handler.setFormatter(logging.Formatter('%(message)s'))
+
 logging.basicConfig(
     level=getattr(logging, os.getenv('LOG_LEVEL', 'INFO')),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=handlers,
+    handlers=[queue_handler],
 )
 
 # Prevent noisy "--- Logging error ---" tracebacks in production.
 logging.raiseExceptions = False
 logger = logging.getLogger(__name__)
 
+TREE_SYNC_CACHE_FILE = Path('data/tree_sync_cache.json')
+
+
+def _load_tree_sync_cache() -> Dict[str, str]:
+    """Return the last synced command-tree signature per scope (guild id or 'global')."""
+    try:
+        data = json.loads(TREE_SYNC_CACHE_FILE.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _save_tree_sync_cache(data: Dict[str, str]) -> None:
+    try:
+        TREE_SYNC_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        TREE_SYNC_CACHE_FILE.write_text(json.dumps(data), encoding='utf-8')
+    except OSError:
+        # Best-effort: worst case the next startup syncs again.
+        logger.warning("Failed to write slash command sync cache", exc_info=True)
+
 class ModMailBot(commands.Bot):
     """ModMail bot class."""
 
-    def __init__(self, config: Config):
-        intents = discord.Intents.default()
-        intents.members = True
-        intents.message_content = True
-        intents.presences = True
+    def __init__(self, config: FrozenConfig):
+        # Only the gateway events modmail consumes (no typing, invites, reactions, ...).
+        intents = discord.Intents(
+            guilds=True,
+            members=True,
+            guild_messages=True,
+            dm_messages=True,
+            message_content=True,
+            # Privileged and very noisy; only enable when something actually reads presences.
+            presences=config.enable_presence,
+        )
 
         super().__init__(
-            command_prefix='!!',
+            command_prefix=config.command_prefix,
             intents=intents,
             help_command=None,
-            owner_id=config.owner_id
+            owner_id=config.owner_id,
+            # Members are only needed on demand; chunking every guild on connect delays on_ready.
+            chunk_guilds_at_startup=False,
         )
 
         self.config = config
+        # Shared by cogs to resolve users without repeated REST fetches.
+        self.user_cache = UserCache(self)
+
+    # Error type -> builder for the user-facing reply; None means the error is ignored.
+    _ERROR_MESSAGES: Dict[type, Optional[Callable[[Any], str]]] = {
+        commands.CommandNotFound: None,
+        commands.MissingPermissions: lambda e: "You don't have permission to do that.",
+        commands.NotOwner: lambda e: "This command is restricted to the bot owner.",
+        commands.CommandOnCooldown: lambda e: f"Command is on cooldown. Try again in {e.retry_after:.2f}s.",
+    }
 
     async def on_command_error(self, ctx: commands.Context, error: commands.CommandError):
         """Global error handler."""
-        if isinstance(error, commands.CommandNotFound):
-            return
-        elif isinstance(error, commands.MissingPermissions):
-            await ctx.send("You don't have permission to do that.", delete_after=5)
-        elif isinstance(error, commands.NotOwner):
-            await ctx.send("This command is restricted to the bot owner.", delete_after=5)
-        elif isinstance(error, commands.CommandOnCooldown):
-            await ctx.send(f"Command is on cooldown. Try again in {error.retry_after:.2f}s.", delete_after=5)
-        else:
-            logger.error(f"Unhandled error in command {ctx.command}: {error}", exc_info=error)
-            await ctx.send("An unexpected error occurred.")
+        # Exact-type hit first; only walk the MRO for subclasses of the handled errors.
+        for error_type in type(error).__mro__:
+            if error_type in self._ERROR_MESSAGES:
+                build_message = self._ERROR_MESSAGES[error_type]
+                if build_message is not None:
+                    await ctx.send(build_message(error), delete_after=5)
+                return
+
+        logger.error("Unhandled error in command %s: %s", ctx.command, error, exc_info=error)
+        await ctx.send("An unexpected error occurred.")
 
     async def setup_hook(self) -> None:
         """Setup hook called before the bot starts."""
         # Load all cogs
-        if os.path.exists('./cogs'):
-            for filename in os.listdir('./cogs'):
-                if filename.endswith('.py') and filename != '__init__.py':
-                    extension_name = f'cogs.{filename[:-3]}'
-                    try:
-                        await self.load_extension(extension_name)
-                        logger.info(f'Loaded {extension_name}')
-                    except Exception as e:
-                        logger.error(f'Failed to load {extension_name}: {e}')
-        else:
-             logger.warning("No cogs directory found.")
+        try:
+            extension_names = await asyncio.to_thread(discover_cogs)
+        except FileNotFoundError:
+            logger.warning("No cogs directory found.")
+            extension_names = ()
+
+        await asyncio.to_thread(warm_cogs, extension_names)
+
+        # Load concurrently; a failing cog must not prevent the others from loading.
+        results = await asyncio.gather(
+            *(self.load_extension(name) for name in extension_names),
+            return_exceptions=True,
+        )
+        for extension_name, result in zip(extension_names, results):
+            if isinstance(result, BaseException):
+                logger.error('Failed to load %s: %s', extension_name, result)
+            else:
+                logger.info('Loaded %s', extension_name)
 
         # Sync slash commands
         try:
-            if self.config.guild_id:
-                guild = discord.Object(id=self.config.guild_id)
+            guild = discord.Object(id=self.config.guild_id) if self.config.guild_id else None
+            if guild is not None:
                 self.tree.copy_global_to(guild=guild)
-                synced = await self.tree.sync(guild=guild)
-                logger.info(f"✅ Synced {len(synced)} slash commands to guild {self.config.guild_id}")
+            scope = str(self.config.guild_id) if guild is not None else 'global'
+            target = f"to guild {self.config.guild_id}" if guild is not None else "globally"
+
+            # Syncing posts the whole tree to Discord; skip it when nothing changed since last time.
+            signature = self._command_tree_signature(guild)
+            sync_cache = await asyncio.to_thread(_load_tree_sync_cache)
+            if sync_cache.get(scope) == signature:
+                logger.info("Slash commands unchanged, skipped syncing %s", target)
             else:
-                synced = await self.tree.sync()
-                logger.info(f"✅ Synced {len(synced)} slash commands globally")
+                synced = await self.tree.sync(guild=guild)
+                logger.info("✅ Synced %d slash commands %s", len(synced), target)
+                sync_cache[scope] = signature
+                await asyncio.to_thread(_save_tree_sync_cache, sync_cache)
         except Exception as e:
-            logger.error(f"❌ Failed to sync slash commands: {e}")
+            logger.error("❌ Failed to sync slash commands: %s", e)
+
+    def _command_tree_signature(self, guild: Optional[discord.Object]) -> str:
+        """Hash the serialized command tree that would be synced for ``guild``."""
+        payload = sorted(
+            (command.to_dict(self.tree) for command in self.tree.get_commands(guild=guild)),
+            key=lambda data: (data.get('type', 1), data['name']),
+        )
+        encoded = json.dumps(payload, sort_keys=True).encode('utf-8')
+        return hashlib.blake2b(encoded, digest_size=16).hexdigest()
 
     async def on_ready(self):
         """Called when the bot is ready."""
@@ -107,14 +236,14 @@ class ModMailBot(commands.Bot):
         if user is None:
             logger.info('Logged in but bot user is not available yet.')
         else:
-            logger.info(f'Logged in as {user} (ID: {user.id})')
+            logger.info('Logged in as %s (ID: %s)', user, user.id)
 
-async def main():
-    """Main function to run the bot."""
+async def run_bot():
+    """Validate the configuration and run the bot until it disconnects."""
     try:
-        config = Config()
+        config = freeze_config(Config())
     except ValidationError as e:
-        logger.error(f"Configuration Error: {e}")
+        logger.error("Configuration Error: %s", e)
         return
 
     if not config.discord_token:
@@ -128,9 +257,24 @@ async def main():
     except KeyboardInterrupt:
         logger.info("Bot shutdown requested.")
     except Exception as e:
-        logger.error(f"Bot encountered an error: {e}")
+        logger.error("Bot encountered an error: %s", e)
     finally:
         await bot.close()
 
+async def main():
+    """Main function to run the bot."""
+    log_listener.start()
+    try:
+        await run_bot()
+    finally:
+        # Flushes any queued records, then the file buffer, before the process exits.
+        log_listener.stop()
+        for handler in handlers:
+            handler.close()
+
 if __name__ == '__main__':
-    asyncio.run(main())
+    if uvloop is not None:
+        with asyncio.Runner(loop_factory=uvloop.new_event_loop) as runner:
+            runner.run(main())
+    else:
+        asyncio.run(main())
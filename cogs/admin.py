@@ -1,6 +1,8 @@
 from discord.ext import commands
+import asyncio
 import logging
-import os
+
+from utils.extensions import discover_cogs
 
 logger = logging.getLogger(__name__)
 
@@ -14,31 +16,57 @@ class Admin(commands.Cog):
         """Reloads all cogs."""
         reload_count = 0
         error_count = 0
-        
+        errors_report: list[str] = []
+
         # Use asyncio.sleep to allow the message to be sent before potentially heavy reload operations
         msg = await ctx.send("Reloading cogs...")
 
-        if not os.path.exists('./cogs'):
-             await msg.edit(content="❌ Cogs directory not found.")
-             return
-
-        for filename in os.listdir('./cogs'):
-            if filename.endswith('.py') and filename != '__init__.py':
-                extension_name = f'cogs.{filename[:-3]}'
-                try:
-                    # Check if loaded using bot.extensions keys
-                    if extension_name in self.bot.extensions:
-                        await self.bot.reload_extension(extension_name)
-                    else:
-                        await self.bot.load_extension(extension_name)
-                    reload_count += 1
-                    logger.info(f"Reloaded {extension_name}")
-                except Exception as e:
-                    error_count += 1
-                    await ctx.send(f"⚠️ Failed to reload `{extension_name}`:\n```py\n{e}\n```")
-                    logger.error(f"Failed to reload {extension_name}: {e}")
-        
+        try:
+            extension_names = await asyncio.to_thread(discover_cogs)
+        except FileNotFoundError:
+            await msg.edit(content="❌ Cogs directory not found.")
+            return
+
+        # Snapshot the loaded extension names so load side effects can't change the decision mid-way
+        loaded = frozenset(self.bot.extensions)
+        results = await asyncio.gather(
+            *(
+                self.bot.reload_extension(name) if name in loaded
+                else self.bot.load_extension(name)
+                for name in extension_names
+            ),
+            return_exceptions=True,
+        )
+
+        for extension_name, result in zip(extension_names, results):
+            if isinstance(result, BaseException):
+                error_count += 1
+                errors_report.append(f"{extension_name}: {result!r}")
+                logger.error("Failed to reload %s: %s", extension_name, result)
+            else:
+                reload_count += 1
+                logger.info("Reloaded %s", extension_name)
+
+        # Report all failures in one message instead of one request per failed cog.
+        if errors_report:
+            report = "\n".join(errors_report)[:1900]
+            await ctx.send(f"⚠️ Failures:\n```py\n{report}\n```")
+
         await msg.edit(content=f"✅ Reloaded {reload_count} cogs with {error_count} errors.")
 
+    @commands.command(name="rescan", hidden=True)
+    @commands.is_owner()
+    async def rescan(self, ctx):
+        """Rescans the cogs directory for added or removed cogs."""
+        discover_cogs.cache_clear()
+        try:
+            extension_names = await asyncio.to_thread(discover_cogs)
+        except FileNotFoundError:
+            await ctx.send("❌ Cogs directory not found.")
+            return
+
+        logger.info("Rescanned cogs: %s", ', '.join(extension_names))
+        await ctx.send(f"🔍 Found {len(extension_names)} cogs. Use `reload` to load new ones.")
+
 async def setup(bot):
     await bot.add_cog(Admin(bot))
@@ -2,40 +2,179 @@
 Modmail cog: Users DM the bot, messages are forwarded to a modmail channel. Mods can reply from the channel.
 """
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
-from utils.config import Config
-from typing import Optional, Dict, Any, Union
+from utils.cache import LRUCache, UserCache
+from utils.config import FrozenConfig
+from utils.ratelimit import TokenBucket
+from typing import Optional, Deque, Dict, Any, Iterable, Iterator, List, Set, Tuple, Union
+import aiohttp
 import asyncio
+import contextlib
+from collections import OrderedDict, defaultdict, deque
 import json
-import aiofiles
 from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
 import logging
+import os
 import random
+import threading
+import time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows; only the in-process lock applies there.
+    fcntl = None  # type: ignore[assignment]
 
 logger = logging.getLogger(__name__)
 
 
+# Session (de)serialization: orjson when installed, stdlib json otherwise. Both take and
+# produce UTF-8 bytes, and orjson's decode error subclasses json.JSONDecodeError.
+if orjson is not None:
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+else:
+    def _json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+    _json_loads = json.loads
+
+
+def _thread_manager_only():
+    """Require Manage Messages in threads; elsewhere pass so the command just does nothing."""
+    async def predicate(ctx: commands.Context) -> bool:
+        if not isinstance(ctx.channel, discord.Thread):
+            return True
+        if not ctx.channel.permissions_for(ctx.author).manage_messages:
+            raise commands.MissingPermissions(['manage_messages'])
+        return True
+    return commands.check(predicate)
+
+
 
 class ModMail(commands.Cog):
     # Session format per user_id (best-effort; older persisted schemas may exist):
-    # { 'thread_id': int, 'last_activity': ISO8601 timestamp, 'state': 'open'|'closed'|'resolved' }
+    # { 'thread_id': int, 'last_activity': epoch seconds, 'state': 'open'|'closed'|'resolved' }
     modmail_sessions: Dict[int, Dict[str, Any]] = {}
-    _session_locks: Dict[int, asyncio.Lock] = {}
-    SESSIONS_FILE = Path("data/modmail_sessions.json")
+    # Discord's documented per-channel ceiling, enforced client-side before sending
+    SEND_BUCKET_LIMIT = 5
+    SEND_BUCKET_WINDOW = 5.0
+    # Transient server errors worth retrying, and the longest a single retry may wait.
+    # discord.py already retries 500/502/504/524 itself before raising; only 503 reaches us unretried.
+    RETRYABLE_STATUSES = frozenset({503})
+    MAX_RETRY_WAIT = 30.0
+    # Discord's global limit is 50 requests/s per bot; relays and DMs stay under it
+    GLOBAL_REQUESTS_PER_SECOND = 50
+    # Global DM budget across all recipients: one token every 100ms, bursts of 50
+    DM_BUCKET_RATE = 10.0
+    DM_BUCKET_CAPACITY = 50
+    # time.monotonic() until which a global rate limit applies to every send
+    _global_backoff_until: float = 0.0
+    # Append-only log: one {"user_id", "session"} record per mutation, last write wins
+    # ("session": null marks a deletion). Replaces the whole-dict JSON snapshot below.
+    SESSIONS_FILE = Path("data/modmail_sessions.jsonl")
+    LEGACY_SESSIONS_FILE = Path("data/modmail_sessions.json")
+    # channel id -> relay webhook id/token, so restarts skip the webhooks() lookup
+    WEBHOOKS_FILE = Path("data/webhooks.json")
+    # Rewrite the log once it holds this many superseded records
+    COMPACT_THRESHOLD = 1000
+    # Give up on the cross-process sessions file lock after this long
+    FILE_LOCK_TIMEOUT_SECONDS = 10.0
+    # Attachments up to this size are re-uploaded; larger ones are relayed as links, since
+    # downloading them is slow, memory-hungry and may exceed the destination's upload limit
+    ATTACHMENT_REUPLOAD_LIMIT = 8_000_000
+    # Attachment downloads in flight at once, across all relays; bounds memory held in buffers
+    MAX_CONCURRENT_DOWNLOADS = 4
+    # Discord's limit on a message's content; attachment links that don't fit spill into follow-ups
+    MESSAGE_CONTENT_LIMIT = 2000
+    # Minimum seconds between @here pings for new sessions
+    NEW_SESSION_PING_INTERVAL = 5.0
+    # Names of the close command, matched against thread messages so they aren't relayed
+    CLOSE_COMMAND_NAMES = ("close", "mclose")
+    # Mutations within this window are coalesced into a single write
+    PERSIST_DEBOUNCE_SECONDS = 0.5
+    # Per-user locks unused for this long are dropped by the sweeper
+    LOCK_IDLE_SECONDS = 3600
+    # Upper bound on per-user DM channels and idle locks kept in memory
+    MAX_CACHED_USERS = 1000
+
+    # Static embeds are built once; never mutate them, copy() first if a send needs changes.
+    _SESSION_STARTED_EMBED = discord.Embed(
+        title="ModMail Started",
+        description=(
+            "✅ Your message has been received and a new modmail session has been opened.\n"
+            "Messages you send here will be forwarded to the moderators."
+        ),
+        color=discord.Color.default(),
+    )
+    # Template for relayed moderator replies; copy() it and set the description per message.
+    _MOD_REPLY_EMBED = discord.Embed(
+        title="A Moderator has Replied",
+        color=discord.Color.from_str("#00ff00"),
+    )
+    _SESSION_CLOSED_EMBED = discord.Embed(
+        title="Session Closed",
+        description="This modmail session has been closed by a moderator.",
+        color=discord.Color.default(),
+    )
 
-    def __init__(self, bot: commands.Bot, config: Config):
+    def __init__(self, bot: commands.Bot, config: FrozenConfig):
         self.bot = bot
         self.config = config
-        self.modmail_channel_id: Optional[int] = getattr(config, 'modmail_channel_id', None)
-        self._dm_semaphore: asyncio.Semaphore = asyncio.Semaphore(10) # Simultaneous DMs
-        self._dm_channel_cache: Dict[int, discord.DMChannel] = {}
-        self._webhook: Optional[discord.Webhook] = None
+        self.modmail_channel_id: Optional[int] = config.modmail_channel_id
+        # Read on every DM and for every session each sweep; FrozenConfig never changes
+        self._reset_seconds = int(config.modmail_reset_seconds or 0)
+        self._global_bucket = TokenBucket(rate=self.GLOBAL_REQUESTS_PER_SECOND, capacity=self.GLOBAL_REQUESTS_PER_SECOND)
+        # Shared DM budget; the per-recipient limit is enforced separately by _reserve_send_slot
+        self._dm_bucket = TokenBucket(rate=self.DM_BUCKET_RATE, capacity=self.DM_BUCKET_CAPACITY)
+        self._dm_channel_cache: LRUCache[int, discord.DMChannel] = LRUCache(maxsize=self.MAX_CACHED_USERS)
+        self._download_semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_DOWNLOADS)
+        # In-flight create_dm() calls by user id
+        self._pending_dm_channels: Dict[int, 'asyncio.Task[discord.DMChannel]'] = {}
+        # Relay webhook per channel id; dropped when Discord reports it gone
+        self._webhook_cache: Dict[int, discord.Webhook] = {}
+        # One webhooks.json write at a time: they share a temp file, and the newest snapshot must land last
+        self._webhooks_save_lock = asyncio.Lock()
+        # Send timestamps per destination id, so bursts wait locally instead of drawing 429s
+        self._send_buckets: Dict[int, Deque[float]] = defaultdict(deque)
+        # Fixed up front when the bot's command prefix is static; None means resolve per message
+        self._close_prefixes: Optional[Tuple[str, ...]] = None
+        if not callable(bot.command_prefix):
+            self._close_prefixes = self._build_close_prefixes(bot.command_prefix)
+        # Resolved modmail channel; re-resolved whenever modmail_channel_id changes
+        self._modmail_channel: Optional[discord.TextChannel] = None
         
-        # Per-user lock to ensure logical consistency
-        self._user_locks: Dict[int, asyncio.Lock] = {}
+        # Per-user lock to ensure logical consistency: user_id -> (lock, last used, monotonic).
+        # Locks are per cog instance so none outlive the event loop they were created on.
+        # Least recently used first, capped at MAX_CACHED_USERS idle entries.
+        self._user_locks: 'OrderedDict[int, Tuple[asyncio.Lock, float]]' = OrderedDict()
         
+        # Reverse index over modmail_sessions: thread_id -> user_id.
+        # Keep in sync through _set_session/_drop_session.
+        self._thread_to_user: Dict[int, int] = {}
+
+        # Debounced persistence: mutations only mark their user's session dirty
+        self._dirty_sessions: Set[int] = set()
+        # Whether the pending batch holds anything beyond activity bumps (worth an fsync)
+        self._structural_dirty = False
+        # Sessions whose last_activity moved since the last write; saved by each sweep and on unload
+        self._touched_sessions: Set[int] = set()
+        # Records in the sessions log, live or superseded; drives compaction
+        self._log_record_count = 0
+        self._flush_task: Optional[asyncio.Task] = None
+        self._warm_task: Optional[asyncio.Task] = None
+        self._last_new_session_ping = float('-inf')
+        # Serializes the worker-thread writers so an append can't land in a log being replaced;
+        # _sessions_file_lock() extends that to other processes sharing the data directory.
+        self._file_lock = threading.Lock()
+
         # Anti-Spam: 1 message every 2 seconds per user bucket
         self.spam_control = commands.CooldownMapping.from_cooldown(1, 2.0, commands.BucketType.user)
 
@@ -44,116 +183,591 @@ class ModMail(commands.Cog):
             await self._load_sessions_from_file()
         except Exception:
             logger.exception("modmail: failed to load persisted sessions")
+        self._rebuild_thread_index()
+        await self._load_webhooks_from_file()
+        self._sweep_locks.start()
+        self._sweep_expired.start()
+        # Resolve the relay webhook up front so the first DM doesn't pay for the lookup.
+        self._warm_task = asyncio.create_task(self._warm_webhook())
+
+    async def cog_unload(self):
+        self._sweep_locks.cancel()
+        self._sweep_expired.cancel()
+        if self._warm_task is not None:
+            self._warm_task.cancel()
+        # Activity bumps aren't written as they happen; save them now so expiry survives a restart.
+        self._dirty_sessions |= self._touched_sessions
+        # Let a pending debounced write finish, then flush anything still unsaved.
+        if self._flush_task is not None and not self._flush_task.done():
+            await self._flush_task
+        if self._dirty_sessions:
+            await self._flush_dirty_sessions()
+
+    def _mark_dirty(self, user_id: int, structural: bool = True):
+        self._dirty_sessions.add(user_id)
+        self._structural_dirty = self._structural_dirty or structural
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._debounced_flush(self.PERSIST_DEBOUNCE_SECONDS))
+
+    async def _debounced_flush(self, delay: float):
+        # Loop so mutations made while a write is in flight get their own flush.
+        while self._dirty_sessions:
+            await asyncio.sleep(delay)
+            await self._flush_dirty_sessions()
+
+    async def _flush_dirty_sessions(self):
+        user_ids, self._dirty_sessions = self._dirty_sessions, set()
+        structural, self._structural_dirty = self._structural_dirty, False
+        self._touched_sessions -= user_ids
+        # Compacting here, on the single flush path, keeps it ordered with the appends;
+        # the snapshot already contains every pending change.
+        self._log_record_count += len(user_ids)
+        if self._log_needs_compaction():
+            await self._compact_sessions_file()
+        else:
+            await self._append_session_records(user_ids, durable=structural)
+
+    def _log_needs_compaction(self) -> bool:
+        return self._log_record_count - len(self.modmail_sessions) > self.COMPACT_THRESHOLD
+
+    @staticmethod
+    def _session_thread_id(session: Any) -> Optional[int]:
+        try:
+            return int(session['thread_id'])
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def _rebuild_thread_index(self):
+        self._thread_to_user = {}
+        for user_id, session in self.modmail_sessions.items():
+            thread_id = self._session_thread_id(session)
+            if thread_id is not None:
+                self._thread_to_user[thread_id] = user_id
+
+    def _set_session(self, user_id: int, session: Dict[str, Any]):
+        self._drop_thread_mapping(user_id)
+        self.modmail_sessions[user_id] = session
+        thread_id = self._session_thread_id(session)
+        if thread_id is not None:
+            self._thread_to_user[thread_id] = user_id
+        self._mark_dirty(user_id)
+
+    def _drop_session(self, user_id: int):
+        self._drop_thread_mapping(user_id)
+        self.modmail_sessions.pop(user_id, None)
+        self._mark_dirty(user_id)
 
-    def cog_unload(self):
-        pass
+    def _touch_activity(self, user_id: int, session: Dict[str, Any]):
+        # Not written per message: bumps are batched into the next sweep (or unload) instead.
+        session['last_activity'] = int(time.time())
+        self._touched_sessions.add(user_id)
+
+    def _drop_thread_mapping(self, user_id: int):
+        thread_id = self._session_thread_id(self.modmail_sessions.get(user_id))
+        if thread_id is not None and self._thread_to_user.get(thread_id) == user_id:
+            del self._thread_to_user[thread_id]
+
+    def _get_user_lock(self, user_id: int) -> asyncio.Lock:
+        entry = self._user_locks.get(user_id)
+        lock = entry[0] if entry else asyncio.Lock()
+        self._user_locks[user_id] = (lock, time.monotonic())
+        self._user_locks.move_to_end(user_id)
+        if len(self._user_locks) > self.MAX_CACHED_USERS:
+            self._evict_idle_locks(len(self._user_locks) - self.MAX_CACHED_USERS)
+        return lock
+
+    def _discard_user_lock(self, user_id: int):
+        # A held lock may have waiters queued on it; those keep it until they're done.
+        entry = self._user_locks.get(user_id)
+        if entry and not entry[0].locked():
+            del self._user_locks[user_id]
+
+    def _evict_idle_locks(self, count: int):
+        # Oldest first, skipping locks that are held (and may have waiters).
+        for user_id, (lock, _) in list(self._user_locks.items()):
+            if count <= 0:
+                break
+            if not lock.locked():
+                del self._user_locks[user_id]
+                count -= 1
+
+    @tasks.loop(minutes=5)
+    async def _sweep_locks(self):
+        cutoff = time.monotonic() - self.LOCK_IDLE_SECONDS
+        for user_id, (lock, last_used) in list(self._user_locks.items()):
+            # A held lock may have waiters queued on it; only drop idle ones.
+            if not lock.locked() and last_used < cutoff:
+                del self._user_locks[user_id]
+
+        now = time.monotonic()
+        for key, bucket in list(self._send_buckets.items()):
+            if not bucket or now - bucket[-1] >= self.SEND_BUCKET_WINDOW:
+                del self._send_buckets[key]
+
+    def _set_modmail_channel(self, channel: discord.TextChannel):
+        self.modmail_channel_id = channel.id
+        self._modmail_channel = channel
+
+    def _get_modmail_channel(self) -> Optional[discord.TextChannel]:
+        channel = self._modmail_channel
+        if channel is not None and channel.id == self.modmail_channel_id:
+            return channel
+        if not self.modmail_channel_id:
+            return None
+        resolved = self.bot.get_channel(self.modmail_channel_id)
+        self._modmail_channel = resolved if isinstance(resolved, discord.TextChannel) else None
+        return self._modmail_channel
+
+    @tasks.loop(seconds=30)
+    async def _sweep_expired(self):
+        # Expired sessions are normally only noticed when the user DMs again; evict the
+        # ones that can never be continued so they stop bloating memory and the log.
+        for user_id, session in list(self.modmail_sessions.items()):
+            if self._is_user_busy(user_id):
+                continue  # A DM for this user is being handled right now
+            if not isinstance(session, dict) or self._is_session_closed(session):
+                evict = True
+            elif self._is_session_expired(session):
+                # An expired session whose thread is still live can still be replied to by mods,
+                # so only evict once the thread is known to be finished.
+                evict = await self._is_session_thread_gone(session)
+                # The lookup may have yielded; don't evict a session that changed meanwhile,
+                # including a mod reply (which doesn't take the user lock) refreshing its activity.
+                evict = (
+                    evict
+                    and self.modmail_sessions.get(user_id) is session
+                    and not self._is_user_busy(user_id)
+                    and self._is_session_expired(session)
+                )
+            else:
+                evict = False
+            if evict:
+                self._drop_session(user_id)
+                self._discard_user_lock(user_id)
+
+        # Save the batched activity bumps. Reloading stale timestamps after a crash would make
+        # live sessions look expired, and the user's next DM would open a duplicate thread.
+        for user_id in self._touched_sessions:
+            self._mark_dirty(user_id, structural=False)
+
+    def _is_user_busy(self, user_id: int) -> bool:
+        entry = self._user_locks.get(user_id)
+        return bool(entry and entry[0].locked())
+
+    async def _is_session_thread_gone(self, session: Dict[str, Any]) -> bool:
+        """True only when the session's thread is known to be deleted, archived or locked.
+
+        Live threads can be missing from the cache, so a miss is checked with the API;
+        anything short of a definite answer (e.g. a transient error) keeps the session.
+        """
+        thread_id = self._session_thread_id(session)
+        if not thread_id:
+            return True
+        thread = self.bot.get_channel(thread_id)
+        if thread is None:
+            try:
+                thread = await self.bot.fetch_channel(thread_id)
+            except (discord.NotFound, discord.Forbidden):
+                return True  # Deleted, or the bot can no longer reach it
+            except discord.HTTPException:
+                return False
+        if not isinstance(thread, discord.Thread):
+            return True
+        return thread.archived or thread.locked
+
+    @_sweep_expired.before_loop
+    async def _before_sweep_expired(self):
+        await self.bot.wait_until_ready()
 
     async def _send_with_retry(self, send_func, *args, max_retries=3, **kwargs):
+        target = getattr(send_func, '__self__', None)
+        key: Optional[int] = getattr(target, 'id', None)
         for attempt in range(max_retries):
+            # Another send hit a global rate limit; don't spend a request learning that again.
+            global_wait = ModMail._global_backoff_until - time.monotonic()
+            if global_wait > 0:
+                await asyncio.sleep(global_wait)
+            await self._reserve_send_slot(key)
+            await self._global_bucket.acquire()
+            last_attempt = attempt >= max_retries - 1
+            if attempt:
+                self._rewind_files(kwargs)
             try:
                 return await send_func(*args, **kwargs)
             except discord.errors.HTTPException as e:
-                if e.status == 429 and attempt < max_retries - 1:
-                    retry_after = getattr(e, 'retry_after', None) or (2 ** attempt) + random.uniform(0, 1)
+                if last_attempt:
+                    raise
+                if e.status == 429:
+                    retry_after, is_global = self._rate_limit_backoff(e, attempt)
+                    if retry_after > self.MAX_RETRY_WAIT:
+                        raise  # Waiting that long would stall the caller; report the failure instead
+                    if is_global:
+                        ModMail._global_backoff_until = max(
+                            ModMail._global_backoff_until, time.monotonic() + retry_after
+                        )
                     await asyncio.sleep(retry_after)
+                elif e.status in self.RETRYABLE_STATUSES:
+                    await asyncio.sleep(self._backoff_delay(attempt))
                 else:
                     raise
-            except Exception:
-                raise
+            except aiohttp.ClientConnectorError:
+                # The connection was never established, so nothing was sent; safe to try again.
+                if last_attempt:
+                    raise
+                await asyncio.sleep(self._backoff_delay(attempt))
+
+    @staticmethod
+    def _rewind_files(kwargs: Dict[str, Any]):
+        """A failed attempt has already read its attachments; rewind them for the resend."""
+        files = list(kwargs.get('files') or [])
+        if kwargs.get('file') is not None:
+            files.append(kwargs['file'])
+        for file in files:
+            file.reset()
+
+    def _backoff_delay(self, attempt: int) -> float:
+        return min(2 ** attempt + random.random(), self.MAX_RETRY_WAIT)
+
+    async def _reserve_send_slot(self, key: Optional[int]):
+        if key is None:
+            return
+        bucket = self._send_buckets[key]
+        window = self.SEND_BUCKET_WINDOW
+        while True:
+            now = time.monotonic()
+            while bucket and now - bucket[0] >= window:
+                bucket.popleft()
+            if len(bucket) < self.SEND_BUCKET_LIMIT:
+                # Reserve the slot now so concurrent senders see it before this send finishes.
+                bucket.append(now)
+                return
+            await asyncio.sleep(bucket[0] + window - now)
+
+    @staticmethod
+    def _rate_limit_backoff(e: discord.HTTPException, attempt: int) -> Tuple[float, bool]:
+        """Return how long to wait after a 429 and whether the limit is global."""
+        headers = getattr(getattr(e, 'response', None), 'headers', None) or {}
+        retry_after: Optional[float] = None
+        # The per-bucket reset header is more precise than the body's retry_after.
+        reset = headers.get('X-RateLimit-Reset-After') or headers.get('Retry-After')
+        if reset:
+            try:
+                retry_after = float(reset)
+            except ValueError:
+                retry_after = None
+        if retry_after is None:
+            retry_after = getattr(e, 'retry_after', None) or (2 ** attempt) + random.random()
+        is_global = str(headers.get('X-RateLimit-Global', '')).lower() == 'true'
+        return retry_after, is_global
     
     async def _send_dm_safe(self, user: Union[discord.User, discord.Member], **kwargs):
-        async with self._dm_semaphore:
-            dm_channel = self._dm_channel_cache.get(user.id)
-            if dm_channel is None:
-                if isinstance(user, discord.Member):
-                    actual_user = user._user
-                else:
-                    actual_user = user
-                dm_channel = await actual_user.create_dm()
-                self._dm_channel_cache[user.id] = dm_channel
-            
-            return await self._send_with_retry(dm_channel.send, **kwargs)
+        dm_channel = await self._get_dm_channel(user)
+        await self._dm_bucket.acquire()
+        return await self._send_with_retry(dm_channel.send, **kwargs)
+
+    async def _get_dm_channel(self, user: Union[discord.User, discord.Member]) -> discord.DMChannel:
+        # The library already tracks DM channels it has seen; only fall back to create_dm() (a REST call) on a miss.
+        dm_channel = self._dm_channel_cache.get(user.id) or user.dm_channel
+        if dm_channel is not None:
+            self._dm_channel_cache.set(user.id, dm_channel)
+            return dm_channel
+
+        # Concurrent sends to the same new recipient share one create_dm() call. This isn't the
+        # per-user session lock: callers may already hold that one, and it isn't reentrant.
+        pending = self._pending_dm_channels.get(user.id)
+        if pending is None:
+            pending = asyncio.create_task(self._create_dm_channel(user))
+            self._pending_dm_channels[user.id] = pending
+            pending.add_done_callback(lambda _: self._pending_dm_channels.pop(user.id, None))
+        return await asyncio.shield(pending)
+
+    async def _create_dm_channel(self, user: Union[discord.User, discord.Member]) -> discord.DMChannel:
+        actual_user = user._user if isinstance(user, discord.Member) else user
+        await self._dm_bucket.acquire()
+        dm_channel = await actual_user.create_dm()
+        self._dm_channel_cache.set(user.id, dm_channel)
+        return dm_channel
 
     async def _get_or_create_webhook(self, channel: discord.TextChannel) -> discord.Webhook:
-        if self._webhook:
-            return self._webhook
-        
+        webhook = self._webhook_cache.get(channel.id)
+        if webhook:
+            return webhook
+
         webhooks = await channel.webhooks()
         for wh in webhooks:
             if wh.token: # Ensure we can use it
-                self._webhook = wh
-                return wh
-        
-        self._webhook = await channel.create_webhook(name="ModMail Relay")
-        return self._webhook
+                webhook = wh
+                break
+        else:
+            webhook = await channel.create_webhook(name="ModMail Relay")
+
+        self._webhook_cache[channel.id] = webhook
+        await self._save_webhooks_to_file()
+        return webhook
+
+    async def _load_webhooks_from_file(self):
+        try:
+            content = await asyncio.to_thread(self.WEBHOOKS_FILE.read_bytes)
+        except FileNotFoundError:
+            return
+        except OSError:
+            logger.warning("modmail: could not read %s", self.WEBHOOKS_FILE, exc_info=True)
+            return
+        try:
+            data = _json_loads(content)
+            for channel_id, entry in data.items():
+                # Bound to the bot's client so sends reuse its HTTP session. Webhook requests
+                # keep their own rate limit state; the bot's limiter doesn't cover them.
+                self._webhook_cache[int(channel_id)] = discord.Webhook.partial(
+                    int(entry['id']), entry['token'], client=self.bot
+                )
+        except (json.JSONDecodeError, AttributeError, KeyError, TypeError, ValueError):
+            # Worst case the webhooks are looked up again on first use.
+            logger.warning("modmail: ignoring malformed %s", self.WEBHOOKS_FILE)
+
+    async def _save_webhooks_to_file(self):
+        async with self._webhooks_save_lock:
+            payload = _json_dumps({
+                str(channel_id): {'id': webhook.id, 'token': webhook.token}
+                for channel_id, webhook in self._webhook_cache.items()
+                if webhook.token
+            })
+            try:
+                await asyncio.to_thread(self._write_webhooks_blocking, payload)
+            except OSError:
+                logger.warning("modmail: could not write %s", self.WEBHOOKS_FILE, exc_info=True)
+
+    def _write_webhooks_blocking(self, payload: bytes):
+        self.WEBHOOKS_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.WEBHOOKS_FILE.with_suffix(self.WEBHOOKS_FILE.suffix + ".tmp")
+        tmp_path.write_bytes(payload)
+        os.replace(tmp_path, self.WEBHOOKS_FILE)
+
+    async def _warm_webhook(self):
+        # The channel cache is only populated once the gateway is ready.
+        await self.bot.wait_until_ready()
+        channel = self._get_modmail_channel()
+        if channel is not None:
+            await self._prepare_webhook(channel)
+
+    async def _prepare_webhook(self, channel: discord.TextChannel):
+        try:
+            await self._get_or_create_webhook(channel)
+        except discord.HTTPException:
+            # Not fatal: the first DM retries the lookup.
+            logger.warning("modmail: could not prepare relay webhook for channel %s", channel.id, exc_info=True)
 
     async def _load_sessions_from_file(self):
+        try:
+            loaded = await asyncio.to_thread(self._read_persisted_sessions)
+        except Exception:
+            logger.exception("modmail: error reading sessions file")
+            return
+        if loaded is None:
+            return
+        sessions, record_count = loaded
+        for session in sessions.values():
+            # Older logs stored ISO8601 strings; parse them once here instead of per message.
+            if isinstance(session, dict) and 'last_activity' in session:
+                session['last_activity'] = self._coerce_timestamp(session['last_activity'])
+        self.modmail_sessions.clear()
+        self.modmail_sessions.update(sessions)
+        # A legacy snapshot has no log yet; compaction writes it out as one.
+        self._log_record_count = len(sessions) if record_count is None else record_count
+        if record_count is None or self._log_needs_compaction():
+            await self._compact_sessions_file()
+
+    def _read_persisted_sessions(self) -> Optional[Tuple[Dict[int, Dict[str, Any]], Optional[int]]]:
+        """Replay the sessions log, falling back to the legacy JSON snapshot.
+
+        Blocking; runs in a worker thread. Returns the sessions and the number of
+        records in the log (None when they came from the legacy snapshot), or None
+        when nothing has been persisted yet.
+        """
         if not self.SESSIONS_FILE.exists():
+            if not self.LEGACY_SESSIONS_FILE.exists():
+                return None
+            return self._read_legacy_sessions_file(), None
+
+        sessions: Dict[int, Dict[str, Any]] = {}
+        record_count = 0
+        with self._sessions_file_lock(exclusive=False), open(self.SESSIONS_FILE, "rb") as fh:
+            for line in fh:
+                if not line.strip():
+                    continue
+                try:
+                    record = _json_loads(line)
+                    user_id = int(record["user_id"])
+                except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+                    # A torn final line from a crash mid-append; skip it.
+                    logger.warning("modmail: skipping malformed sessions log record")
+                    continue
+                record_count += 1
+                session = record.get("session")
+                if session is None:
+                    sessions.pop(user_id, None)
+                else:
+                    sessions[user_id] = session
+        return sessions, record_count
+
+    def _read_legacy_sessions_file(self) -> Dict[int, Dict[str, Any]]:
+        content = self.LEGACY_SESSIONS_FILE.read_bytes()
+        if not content.strip():
+            return {}
+        try:
+            data = _json_loads(content)
+        except json.JSONDecodeError:
+            logger.warning("modmail: legacy sessions file is not valid JSON; ignoring")
+            return {}
+        sessions: Dict[int, Dict[str, Any]] = {}
+        for k, v in data.items():
+            try:
+                sessions[int(k)] = v
+            except Exception:
+                logger.exception(f"modmail: failed to load session for key {k}")
+        return sessions
+
+    @staticmethod
+    def _session_record(user_id: int, session: Optional[Dict[str, Any]]) -> bytes:
+        return _json_dumps({"user_id": user_id, "session": session}) + b"\n"
+
+    async def _append_session_records(self, user_ids: Set[int], durable: bool = True):
+        if not user_ids:
             return
+        # Serialize on the loop so the worker thread never sees a dict mid-mutation.
+        # Deleted sessions are written as null so replay drops them.
+        payload = b"".join(self._session_record(uid, self.modmail_sessions.get(uid)) for uid in user_ids)
         try:
-            async with aiofiles.open(self.SESSIONS_FILE, "r", encoding="utf-8") as fh:
-                content = await fh.read()
-                if not content.strip():
-                    return
-                try:
-                    data = json.loads(content)
-                except json.JSONDecodeError:
-                    logger.warning("modmail: sessions file is not valid JSON; ignoring")
-                    return
-            for k, v in data.items():
-                try:
-                    self.modmail_sessions[int(k)] = v
-                except Exception:
-                    logger.exception(f"modmail: failed to load session for key {k}")
+            await asyncio.to_thread(self._append_blocking, payload, durable)
         except Exception:
-            logger.exception("modmail: error reading sessions file")
+            logger.exception("modmail: failed to append session records")
 
-    async def _persist_sessions_to_file(self):
+    async def _compact_sessions_file(self):
+        """Rewrite the log with a single record per live session."""
+        payload = b"".join(self._session_record(uid, v) for uid, v in self.modmail_sessions.items())
         try:
-            self.SESSIONS_FILE.parent.mkdir(parents=True, exist_ok=True)
-            dumpable = {str(k): v for k, v in self.modmail_sessions.items()}
-            tmp_path = self.SESSIONS_FILE.with_suffix(self.SESSIONS_FILE.suffix + ".tmp")
-            async with aiofiles.open(tmp_path, "w", encoding="utf-8") as fh:
-                await fh.write(json.dumps(dumpable))
-            tmp_path.replace(self.SESSIONS_FILE)
+            await asyncio.to_thread(self._write_snapshot_blocking, payload)
         except Exception:
-            logger.exception("modmail: failed to persist sessions to file")
+            logger.exception("modmail: failed to compact sessions file")
+            return
+        self._log_record_count = len(self.modmail_sessions)
+
+    def _append_blocking(self, payload: bytes, durable: bool = True):
+        with self._sessions_file_lock():
+            with open(self.SESSIONS_FILE, "ab") as fh:
+                fh.write(payload)
+                # Opens, closes and evictions must survive a power loss. A batch of activity bumps
+                # only needs to reach the OS, which already survives a crash of the bot itself.
+                if durable:
+                    fh.flush()
+                    os.fsync(fh.fileno())
+
+    def _write_snapshot_blocking(self, payload: bytes):
+        # Write-then-rename: readers (and a crash) only ever see the old or the new log.
+        with self._sessions_file_lock():
+            tmp_path = self.SESSIONS_FILE.with_suffix(self.SESSIONS_FILE.suffix + ".tmp")
+            with open(tmp_path, "wb") as fh:
+                fh.write(payload)
+                fh.flush()
+                os.fsync(fh.fileno())
+            os.replace(tmp_path, self.SESSIONS_FILE)
+
+    @contextlib.contextmanager
+    def _sessions_file_lock(self, exclusive: bool = True) -> Iterator[None]:
+        """Hold the sessions file lock for this process and, where supported, across processes.
+
+        The log is swapped out by os.replace() on compaction, so the OS lock is
+        taken on a sibling ``.lock`` file rather than on the log itself. Raises
+        TimeoutError if another process holds it for FILE_LOCK_TIMEOUT_SECONDS.
+        """
+        with self._file_lock:
+            self.SESSIONS_FILE.parent.mkdir(parents=True, exist_ok=True)
+            if fcntl is None:
+                yield
+                return
+            lock_path = self.SESSIONS_FILE.with_suffix(self.SESSIONS_FILE.suffix + ".lock")
+            with open(lock_path, "ab") as lock_fh:
+                mode = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+                deadline = time.monotonic() + self.FILE_LOCK_TIMEOUT_SECONDS
+                while True:
+                    try:
+                        fcntl.flock(lock_fh.fileno(), mode | fcntl.LOCK_NB)
+                        break
+                    except BlockingIOError:
+                        if time.monotonic() >= deadline:
+                            raise TimeoutError(f"sessions file lock {lock_path} is held by another process")
+                        time.sleep(0.05)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_fh.fileno(), fcntl.LOCK_UN)
+
+    async def _resolve_user(self, user_id: int) -> Optional[discord.User]:
+        user_cache: Optional[UserCache] = getattr(self.bot, 'user_cache', None)
+        if user_cache is None:
+            return self.bot.get_user(user_id)
+        try:
+            return await user_cache.fetch(user_id)
+        except discord.HTTPException:
+            return None
 
     def _is_session_expired(self, session: Dict[str, Any]) -> bool:
-        reset_seconds = int(getattr(self.config, 'modmail_reset_seconds', 0) or 0)
+        reset_seconds = self._reset_seconds
         if reset_seconds <= 0:
             return False
 
         last_activity = session.get('last_activity')
-        if not last_activity:
+        if not isinstance(last_activity, (int, float)):
             return False
 
-        try:
-            last_dt = datetime.fromisoformat(str(last_activity))
-        except Exception:
-            return False
+        return time.time() - last_activity > reset_seconds
 
-        return (datetime.utcnow() - last_dt) > timedelta(seconds=reset_seconds)
+    @staticmethod
+    def _coerce_timestamp(value: Any) -> Optional[float]:
+        """Convert a persisted timestamp (epoch seconds, or a legacy naive-UTC ISO string) to epoch seconds."""
+        if isinstance(value, (int, float)):
+            return float(value)
+        if isinstance(value, str):
+            try:
+                parsed = datetime.fromisoformat(value)
+            except ValueError:
+                return None
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=timezone.utc)
+            return parsed.timestamp()
+        return None
 
     def _is_session_closed(self, session: Dict[str, Any]) -> bool:
         state = str(session.get('state') or '').lower()
         return state in {'closed', 'resolved'}
 
-    def _get_thread_from_session(
+    async def _resolve_session_thread(
         self,
         session: Dict[str, Any],
         main_channel: discord.TextChannel,
     ) -> Optional[discord.Thread]:
-        thread_id = session.get('thread_id')
+        """Return the session's open thread, asking the API about threads missing from the cache.
+
+        A live thread can be missing from the cache (e.g. after the bot briefly lost
+        access to the channel); one fetch is cheaper than opening a duplicate thread.
+        """
+        thread_id = self._session_thread_id(session)
         if not thread_id:
             return None
-        try:
-            thread = main_channel.get_thread(int(thread_id))
-        except Exception:
-            return None
-        if not thread:
-            return None
-        if getattr(thread, 'archived', False) or getattr(thread, 'locked', False):
+        thread = main_channel.get_thread(thread_id)
+        if thread is None:
+            try:
+                fetched = await self.bot.fetch_channel(thread_id)
+            except discord.HTTPException:
+                return None  # Deleted, or no longer visible to the bot
+            if not isinstance(fetched, discord.Thread) or fetched.parent_id != main_channel.id:
+                return None
+            thread = fetched
+        return self._open_thread_or_none(thread)
+
+    @staticmethod
+    def _open_thread_or_none(thread: Optional[discord.Thread]) -> Optional[discord.Thread]:
+        if thread is None or thread.archived or thread.locked:
             return None
         return thread
 
@@ -167,8 +781,9 @@ class ModMail(commands.Cog):
             await self.handle_dm_message(message)
             return
 
-        # Handle Thread -> DM (Mod Reply)
-        if isinstance(message.channel, discord.Thread):
+        # Handle Thread -> DM (Mod Reply). Gate on the session index rather than the parent:
+        # sessions opened before a modmail channel switch live under the old channel.
+        if isinstance(message.channel, discord.Thread) and message.channel.id in self._thread_to_user:
             await self.handle_thread_reply(message)
 
     async def handle_dm_message(self, message: discord.Message):
@@ -181,21 +796,19 @@ class ModMail(commands.Cog):
             return
 
         try:
-            user_id = message.author.id
-            if user_id not in self._user_locks:
-                self._user_locks[user_id] = asyncio.Lock()
+            # Configuration checks need no per-user state; don't allocate a lock for DMs that can't be served.
+            if not self.modmail_channel_id:
+                 await message.channel.send("ModMail system is currently disabled (Channel not set).")
+                 return
+
+            main_channel = self._get_modmail_channel()
+            if not main_channel:
+                 await message.channel.send("ModMail system is unavailable (Invalid channel configuration).")
+                 return
 
-            async with self._user_locks[user_id]:
+            user_id = message.author.id
+            async with self._get_user_lock(user_id):
                 session = self.modmail_sessions.get(user_id)
-                
-                if not self.modmail_channel_id:
-                     await message.channel.send("ModMail system is currently disabled (Channel not set).")
-                     return
-                     
-                main_channel = self.bot.get_channel(self.modmail_channel_id)
-                if not main_channel or not isinstance(main_channel, discord.TextChannel):
-                     await message.channel.send("ModMail system is unavailable (Invalid channel configuration).")
-                     return
 
                 webhook = await self._get_or_create_webhook(main_channel)
 
@@ -203,7 +816,7 @@ class ModMail(commands.Cog):
                 session_active = False
                 if session and isinstance(session, dict):
                     if not self._is_session_closed(session) and not self._is_session_expired(session):
-                        thread = self._get_thread_from_session(session, main_channel)
+                        thread = await self._resolve_session_thread(session, main_channel)
                         session_active = thread is not None
 
                 if not session_active:
@@ -214,10 +827,10 @@ class ModMail(commands.Cog):
                             title="📨 New ModMail Created",
                             description=f"**User:** {message.author.mention} (`{message.author.id}`)",
                             color=discord.Color.gold(),
-                            timestamp=datetime.utcnow()
+                            timestamp=discord.utils.utcnow()
                         )
                         log_embed.set_thumbnail(url=message.author.display_avatar.url)
-                        starter_msg = await main_channel.send(content="@here", embed=log_embed)
+                        starter_msg = await main_channel.send(content=self._new_session_ping(), embed=log_embed)
 
                         # Create public thread from the log message
                         thread = await starter_msg.create_thread(name=f"ModMail - {message.author.name} ({user_id})")
@@ -231,156 +844,201 @@ class ModMail(commands.Cog):
                     # Notify user
                     await self._send_dm_safe(
                         message.author,
-                        embed=discord.Embed(
-                            title="ModMail Started",
-                            description=(
-                                "✅ Your message has been received and a new modmail session has been opened.\n"
-                                "Messages you send here will be forwarded to the moderators."
-                            ),
-                            color=discord.Color.default(),
-                        ),
+                        embed=self._SESSION_STARTED_EMBED,
                     )
 
                     # Send initial message via webhook
-                    files = [await f.to_file() for f in message.attachments]
-                    try:
-                        await webhook.send(
-                            content=message.content,
-                            username=message.author.name,
-                            avatar_url=message.author.display_avatar.url,
-                            thread=thread,
-                            files=files
-                        )
-                    except Exception as e:
-                        if thread is not None:
-                            await thread.send(f"Failed to relay message from user: {e}")
-                        raise e
-                    
-                    self.modmail_sessions[user_id] = {
+                    await self._relay_to_thread(webhook, thread, message)
+
+                    self._set_session(user_id, {
                         'thread_id': thread.id,
-                        'last_activity': datetime.utcnow().isoformat(),
+                        'last_activity': int(time.time()),
                         'state': 'open'
-                    }
+                    })
                 else:
                     # Continue session
                     # `thread` is guaranteed by session_active
                     assert thread is not None
                     assert isinstance(session, dict)
 
-                    files = [await f.to_file() for f in message.attachments]
-                    try:
-                        await webhook.send(
-                            content=message.content,
-                            username=message.author.name,
-                            avatar_url=message.author.display_avatar.url,
-                            thread=thread,
-                            files=files
-                        )
-                    except Exception as e:
-                         if thread is not None:
-                             await thread.send(f"Failed to relay message from user: {e}")
-                         raise e
-                    session['last_activity'] = datetime.utcnow().isoformat()
-                    session.setdefault('state', 'open')
-
-                await self._persist_sessions_to_file()
+                    await self._relay_to_thread(webhook, thread, message)
+                    if 'state' in session:
+                        self._touch_activity(user_id, session)
+                    else:
+                        # Legacy session without a state; that one is worth persisting.
+                        session.update(last_activity=int(time.time()), state='open')
+                        self._mark_dirty(user_id)
         except Exception as e:
             logger.exception(f"Error handling DM message from {message.author.id}")
             try:
                 await message.channel.send(f"❌ An internal error occurred: {str(e)}")
-            except:
-                pass
+            except discord.HTTPException:
+                logger.debug("modmail: could not report error to user %s", message.author.id, exc_info=True)
 
-    async def handle_thread_reply(self, message: discord.Message):
-        # Find user_id from thread_id
-        session_user_id = None
-        for uid, data in self.modmail_sessions.items():
-            if data.get('thread_id') == message.channel.id:
-                session_user_id = uid
-                break
-        
-        if not session_user_id:
-            return # Not a modmail thread
+    def _new_session_ping(self) -> Optional[str]:
+        # One @here per burst: sessions opened shortly after a ping land right under it anyway.
+        now = time.monotonic()
+        if now - self._last_new_session_ping < self.NEW_SESSION_PING_INTERVAL:
+            return None
+        self._last_new_session_ping = now
+        return "@here"
+
+    async def _download_attachments(self, message: discord.Message) -> List[discord.File]:
+        attachments = [a for a in message.attachments if a.size <= self.ATTACHMENT_REUPLOAD_LIMIT]
+        if not attachments:
+            return []
+        # Independent CDN downloads; fetch them concurrently rather than one by one.
+        return list(await asyncio.gather(*(self._download_attachment(a) for a in attachments)))
+
+    async def _download_attachment(self, attachment: discord.Attachment) -> discord.File:
+        async with self._download_semaphore:
+            return await attachment.to_file()
+
+    def _with_attachment_links(self, content: str, message: discord.Message) -> List[str]:
+        """Append the URLs of the attachments _download_attachments() leaves out.
+
+        Returns the texts to send: ``content`` with as many links as fit in
+        MESSAGE_CONTENT_LIMIT, followed by the remaining links packed the same way.
+        """
+        chunks = [content]
+        for link in (a.url for a in message.attachments if a.size > self.ATTACHMENT_REUPLOAD_LIMIT):
+            if not chunks[-1]:
+                chunks[-1] = link
+            elif len(chunks[-1]) + 1 + len(link) <= self.MESSAGE_CONTENT_LIMIT:
+                chunks[-1] += "\n" + link
+            else:
+                chunks.append(link)
+        return chunks
+
+    async def _relay_to_thread(self, webhook: discord.Webhook, thread: discord.Thread, message: discord.Message):
+        """Forward a user's DM into their modmail thread, impersonating them via the webhook."""
+        try:
+            try:
+                await self._send_as_author(webhook, thread, message)
+            except (discord.NotFound, discord.Forbidden):
+                # The cached webhook was deleted or lost access upstream; replace it and resend once.
+                parent = thread.parent
+                if not isinstance(parent, discord.TextChannel):
+                    raise
+                self._webhook_cache.pop(parent.id, None)
+                webhook = await self._get_or_create_webhook(parent)
+                await self._send_as_author(webhook, thread, message)
+        except Exception as e:
+            await thread.send(f"Failed to relay message from user: {e}")
+            raise e
 
-        # Ignore commands
-        prefixes = await self.bot.get_prefix(message)
+    async def _send_as_author(self, webhook: discord.Webhook, thread: discord.Thread, message: discord.Message):
+        # Files are closed once sent, so each attempt downloads its own copies.
+        files = await self._download_attachments(message)
+        content, *overflow = self._with_attachment_links(message.content, message)
+        await self._global_bucket.acquire()
+        await webhook.send(
+            content=content,
+            username=message.author.name,
+            avatar_url=message.author.display_avatar.url,
+            thread=thread,
+            files=files
+        )
+        for extra in overflow:
+            await self._global_bucket.acquire()
+            await webhook.send(
+                content=extra,
+                username=message.author.name,
+                avatar_url=message.author.display_avatar.url,
+                thread=thread
+            )
+
+    async def _get_close_prefixes(self, message: discord.Message) -> Tuple[str, ...]:
+        """Return every '<prefix><close alias>' string a close command can start with."""
+        if self._close_prefixes is not None:
+            return self._close_prefixes
+        # A callable prefix may differ per message, so this result isn't cached.
+        return self._build_close_prefixes(await self.bot.get_prefix(message))
+
+    @classmethod
+    def _build_close_prefixes(cls, prefixes: Union[str, Iterable[str]]) -> Tuple[str, ...]:
         if isinstance(prefixes, str):
             prefixes = [prefixes]
-            
-        if message.content.startswith(tuple([p + "close" for p in prefixes])):
-             return
-        if message.content.startswith("!!close"):
-             return
+        return tuple(p + name for p in prefixes for name in cls.CLOSE_COMMAND_NAMES) + ("!!close",)
+
+    async def handle_thread_reply(self, message: discord.Message):
+        # Ignore close commands (checked first: it's cheaper than the session lookup)
+        if message.content.startswith(await self._get_close_prefixes(message)):
+            return
 
-        user = self.bot.get_user(session_user_id)
+        session_user_id = self._thread_to_user.get(message.channel.id)
+        if not session_user_id:
+            return # Not a modmail thread
+
+        user = await self._resolve_user(session_user_id)
         if not user:
             await message.channel.send("⚠️ User cannot be found (might have left shared servers).")
             return
 
         try:
-             files = [await f.to_file() for f in message.attachments]
-             embed = discord.Embed(
-                 title="A Moderator has Replied",
-                 description="> "+message.content, 
-                 color=discord.Color.from_str("#00ff00")
-             )
+             files = await self._download_attachments(message)
+             embed = self._MOD_REPLY_EMBED.copy()
+             embed.description, *overflow = self._with_attachment_links("> " + message.content, message)
              # embed.set_author(name=message.author.display_name, icon_url=message.author.display_avatar.url)
              await self._send_dm_safe(user, embed=embed, files=files)
+             for extra in overflow:
+                 await self._send_dm_safe(user, content=extra)
              
-             self.modmail_sessions[session_user_id]['last_activity'] = datetime.utcnow().isoformat()
-             await self._persist_sessions_to_file()
+             session = self.modmail_sessions.get(session_user_id)
+             if isinstance(session, dict):  # May have been closed while the DM was in flight
+                 self._touch_activity(session_user_id, session)
              # Optional: React to confirm sent
              await message.add_reaction("✅")
         except Exception as e:
             await message.channel.send(f"❌ Failed to send to user: {e}")
 
+    async def _notify_user_closed(self, user_id: int):
+        user = await self._resolve_user(user_id)
+        if not user:
+            return
+        try:
+            await user.send(embed=self._SESSION_CLOSED_EMBED)
+        except discord.HTTPException:
+            # DMs closed or user unreachable; the close itself still goes ahead.
+            logger.debug("modmail: could not notify user %s of closure", user_id, exc_info=True)
+
+    async def _log_closure(self, user_id: int, thread: discord.Thread, closed_by: Union[discord.User, discord.Member]):
+        main_channel = self._get_modmail_channel()
+        if not main_channel:
+            return
+        try:
+            log_embed = discord.Embed(
+                title="📪 ModMail Closed",
+                description=f"**User:** <@{user_id}> (`{user_id}`)\n**Thread:** {thread.mention}\n**Closed By:** {closed_by.mention}",
+                color=discord.Color.from_str("#ff0000"),
+                timestamp=discord.utils.utcnow()
+            )
+            await main_channel.send(embed=log_embed)
+        except Exception as e:
+            logger.error(f"Failed to send modmail close log: {e}")
+
     @commands.command(name="close", aliases=["mclose"])
+    @_thread_manager_only()
     async def close_session(self, ctx):
         if not isinstance(ctx.channel, discord.Thread):
              return
 
-        session_user_id = None
-        for uid, data in self.modmail_sessions.items():
-            if data.get('thread_id') == ctx.channel.id:
-                session_user_id = uid
-                break
-
+        session_user_id = self._thread_to_user.get(ctx.channel.id)
         if not session_user_id:
             await ctx.send("This is not a active modmail thread.")
             return
 
         # Close session
-        del self.modmail_sessions[session_user_id]
-        await self._persist_sessions_to_file()
-        
-        user = self.bot.get_user(session_user_id)
-        if user:
-            try:
-                await user.send(embed=discord.Embed(
-                    title="Session Closed", 
-                    description="This modmail session has been closed by a moderator.",
-                    color=discord.Color.default()
-                ))
-            except:
-                pass
-
-        # Log closure to main channel
-        if self.modmail_channel_id:
-             main_channel = self.bot.get_channel(self.modmail_channel_id)
-             if main_channel and isinstance(main_channel, discord.TextChannel):
-                 try:
-                    log_embed = discord.Embed(
-                        title="📪 ModMail Closed",
-                        description=f"**User:** <@{session_user_id}> (`{session_user_id}`)\n**Thread:** {ctx.channel.mention}\n**Closed By:** {ctx.author.mention}",
-                        color=discord.Color.from_str("#ff0000"),
-                        timestamp=datetime.utcnow()
-                    )
-                    await main_channel.send(embed=log_embed)
-                 except Exception as e:
-                    logger.error(f"Failed to send modmail close log: {e}")
-        
-        await ctx.send("Session closed. Archiving thread...")
+        self._drop_session(session_user_id)
+        self._discard_user_lock(session_user_id)
         
+        # The user DM, the log entry and the thread notice hit independent endpoints; send them together.
+        await asyncio.gather(
+            self._notify_user_closed(session_user_id),
+            self._log_closure(session_user_id, ctx.channel, ctx.author),
+            ctx.send("Session closed. Archiving thread..."),
+        )
+
         new_name = f"🔒 {ctx.channel.name}"
         if len(new_name) > 100:
             new_name = new_name[:100]
@@ -395,16 +1053,22 @@ class ModMail(commands.Cog):
         if not channel:
             await ctx.send("Please mention a text channel or use this command in a text channel.")
             return
-        self.modmail_channel_id = channel.id
+        self._set_modmail_channel(channel)
         await ctx.send(f"Modmail channel set to {channel.mention}.")
+        await self._prepare_webhook(channel)
+
+    def _has_guild_permission(self, interaction: discord.Interaction, permission: str) -> bool:
+        # Guild interactions carry the invoking Member, so no member cache lookup is needed.
+        member = interaction.user if isinstance(interaction.user, discord.Member) else None
+        if member is None:
+            return False
+        # Computed fresh: a revoked permission must take effect immediately.
+        return bool(getattr(member.guild_permissions, permission))
 
     @app_commands.command(name="set_modmail_channel", description="Set the modmail channel (admin only)")
     @app_commands.describe(channel="Channel to set as modmail")
     async def set_modmail_channel_slash(self, interaction: discord.Interaction, channel: Optional[discord.TextChannel] = None):
-        member = None
-        if interaction.guild:
-            member = interaction.guild.get_member(interaction.user.id)
-        if not (member and member.guild_permissions.administrator):
+        if not self._has_guild_permission(interaction, 'administrator'):
             await interaction.response.send_message("You don't have permission to use this command.", ephemeral=True)
             return
         if not channel:
@@ -414,8 +1078,9 @@ class ModMail(commands.Cog):
                 await interaction.response.send_message("Please specify a text channel or use this in a text channel.", ephemeral=True)
                 return
         assert channel is not None
-        self.modmail_channel_id = channel.id
+        self._set_modmail_channel(channel)
         await interaction.response.send_message(f"Modmail channel set to {channel.mention}.", ephemeral=True)
+        await self._prepare_webhook(channel)
 
 async def setup(bot):
     config = getattr(bot, 'config', None)
@@ -0,0 +1,81 @@
+"""
+Small in-process caches for Discord entity lookups.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Generic, Hashable, Optional, Tuple, TypeVar
+
+import discord
+from discord.ext import commands
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+
+class LRUCache(Generic[K, V]):
+    """Mapping that keeps at most ``maxsize`` entries, evicting the least recently used."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data: 'OrderedDict[K, V]' = OrderedDict()
+
+    def get(self, key: K) -> Optional[V]:
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+        return value
+
+    def set(self, key: K, value: V) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+
+class TTLCache(Generic[K, V]):
+    """Size-bounded mapping whose entries expire ``ttl`` seconds after being stored."""
+
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: 'OrderedDict[K, Tuple[float, V]]' = OrderedDict()
+
+    def get(self, key: K) -> Optional[V]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: K, value: V) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+
+class UserCache:
+    """Resolve users from the gateway cache, then recent REST fetches, then the API."""
+
+    def __init__(self, bot: commands.Bot, ttl: float = 300, maxsize: int = 1024):
+        self.bot = bot
+        self._fetched: TTLCache[int, discord.User] = TTLCache(ttl, maxsize)
+
+    def get(self, user_id: int) -> Optional[discord.User]:
+        return self.bot.get_user(user_id) or self._fetched.get(user_id)
+
+    async def fetch(self, user_id: int) -> discord.User:
+        """Return the user, only calling the REST API on a cache miss.
+
+        Raises ``discord.NotFound``/``discord.HTTPException`` like ``Bot.fetch_user``.
+        """
+        user = self.get(user_id)
+        if user is None:
+            user = await self.bot.fetch_user(user_id)
+            self._fetched.set(user_id, user)
+        return user
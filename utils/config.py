@@ -1,44 +1,93 @@
-"""
-Configuration management using Pydantic settings.
-"""
-
-from typing import Optional
-
-from pydantic import Field
-from pydantic_settings import BaseSettings
-
-
-class Config(BaseSettings):
-    """Bot configuration settings."""
-
-    discord_token: str = Field(...)
-    guild_id: Optional[int] = Field(default=None)
-    database_url: str = Field(default='sqlite+aiosqlite:///fun2oosh.db')
-    log_level: str = Field(default='INFO')
-    owner_id: Optional[int] = Field(default=None)
-    topgg_token: Optional[str] = Field(default=None)
-    topgg_webhook_secret: Optional[str] = Field(default=None)
-    redis_url: Optional[str] = Field(default=None)
-
-    # Modmail settings
-    modmail_channel_id: Optional[int] = Field(default=None)
-    modmail_reset_seconds: int = Field(default=600)
-
-    # CodeBuddy settings
-    question_channel_id: Optional[int] = Field(default=None)
-
-    # Game settings
-    min_bet: int = Field(default=10)
-    max_bet: int = Field(default=10000)
-    daily_wager_limit: int = Field(default=50000)
-    work_reward: int = Field(default=100)
-    daily_reward: int = Field(default=500)
-    weekly_reward: int = Field(default=2000)
-    collect_cooldown: int = Field(default=3600)
-    work_cooldown: int = Field(default=1800)
-    daily_cooldown: int = Field(default=86400)
-    weekly_cooldown: int = Field(default=604800)
-
-    class Config:
-        env_file = '.env'
-        case_sensitive = False
+"""
+Configuration management using Pydantic settings.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+
+class Config(BaseSettings):
+    """Bot configuration settings."""
+
+    discord_token: str = Field(...)
+    guild_id: Optional[int] = Field(default=None)
+    database_url: str = Field(default='sqlite+aiosqlite:///fun2oosh.db')
+    log_level: str = Field(default='INFO')
+    owner_id: Optional[int] = Field(default=None)
+    command_prefix: str = Field(default='!!')
+    enable_presence: bool = Field(default=False)
+    topgg_token: Optional[str] = Field(default=None)
+    topgg_webhook_secret: Optional[str] = Field(default=None)
+    redis_url: Optional[str] = Field(default=None)
+
+    # Modmail settings
+    modmail_channel_id: Optional[int] = Field(default=None)
+    modmail_reset_seconds: int = Field(default=600)
+
+    # CodeBuddy settings
+    question_channel_id: Optional[int] = Field(default=None)
+
+    # Game settings
+    min_bet: int = Field(default=10)
+    max_bet: int = Field(default=10000)
+    daily_wager_limit: int = Field(default=50000)
+    work_reward: int = Field(default=100)
+    daily_reward: int = Field(default=500)
+    weekly_reward: int = Field(default=2000)
+    collect_cooldown: int = Field(default=3600)
+    work_cooldown: int = Field(default=1800)
+    daily_cooldown: int = Field(default=86400)
+    weekly_cooldown: int = Field(default=604800)
+
+    class Config:
+        env_file = '.env'
+        case_sensitive = False
+        frozen = True
+
+
+@dataclass(frozen=True, slots=True)
+class FrozenConfig:
+    """Read-only bot configuration, validated by Config.
+
+    Attribute reads are plain slot lookups instead of going through pydantic's
+    model machinery. Keep the fields in step with Config; freeze_config() fails
+    loudly if they drift apart.
+    """
+
+    discord_token: str
+    guild_id: Optional[int]
+    database_url: str
+    log_level: str
+    owner_id: Optional[int]
+    command_prefix: str
+    enable_presence: bool
+    topgg_token: Optional[str]
+    topgg_webhook_secret: Optional[str]
+    redis_url: Optional[str]
+
+    # Modmail settings
+    modmail_channel_id: Optional[int]
+    modmail_reset_seconds: int
+
+    # CodeBuddy settings
+    question_channel_id: Optional[int]
+
+    # Game settings
+    min_bet: int
+    max_bet: int
+    daily_wager_limit: int
+    work_reward: int
+    daily_reward: int
+    weekly_reward: int
+    collect_cooldown: int
+    work_cooldown: int
+    daily_cooldown: int
+    weekly_cooldown: int
+
+
+def freeze_config(config: Config) -> FrozenConfig:
+    """Return a FrozenConfig snapshot of an already validated Config."""
+    return FrozenConfig(**config.model_dump())
@@ -0,0 +1,46 @@
+"""
+Discovery of the cog extensions shipped in the cogs directory.
+"""
+
+import functools
+import importlib.util
+import os
+from typing import Iterable, Tuple
+
+COGS_DIR = './cogs'
+
+
+@functools.lru_cache(maxsize=None)
+def discover_cogs() -> Tuple[str, ...]:
+    """Return the extension names of all cogs.
+
+    The directory is scanned once and the result cached; call
+    ``discover_cogs.cache_clear()`` to pick up added or removed cog files.
+    Async callers should run it via ``asyncio.to_thread`` so a slow filesystem
+    cannot stall the event loop.
+    """
+    with os.scandir(COGS_DIR) as it:
+        return tuple(
+            f'cogs.{entry.name[:-3]}'
+            for entry in it
+            if entry.is_file() and entry.name.endswith('.py') and entry.name != '__init__.py'
+        )
+
+
+def warm_cogs(extension_names: Iterable[str]) -> None:
+    """Read and compile the cog sources ahead of ``load_extension``.
+
+    ``load_extension`` executes a fresh module from its spec (it never reuses
+    ``sys.modules``), so importing here would run each cog twice. Instead this
+    primes the bytecode cache and the OS page cache, which is the blocking part
+    of loading. Meant to run in a worker thread; errors are left for
+    ``load_extension`` to report.
+    """
+    for name in extension_names:
+        try:
+            spec = importlib.util.find_spec(name)
+            get_code = getattr(spec.loader, 'get_code', None) if spec else None
+            if get_code is not None:
+                get_code(name)
+        except Exception:
+            continue
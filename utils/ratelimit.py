@@ -0,0 +1,30 @@
+"""
+Client-side rate limiting helpers for outgoing Discord requests.
+"""
+
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Allow bursts of up to ``capacity`` acquisitions, refilling ``rate`` tokens per second."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """Take one token, sleeping until one is available."""
+        while True:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)